@@ -4,10 +4,13 @@ from ethereum.tester import keys, accounts
 from ethereum.tester import TransactionFailed
 from ethereum.utils import sha3
 from preprocessor import PreProcessor
+from profiler import Profiler
 # signing
 from bitcoin import ecdsa_raw_sign
 # standard libraries
 from unittest import TestCase
+import os
+import sys
 
 
 HOMESTEAD_BLOCK = 1150000
@@ -35,6 +38,11 @@ TOKEN_ISSUANCE_PERIOD = 604800  # 1 week, guard has to issue tokens within one w
 ETH_VALUE_PER_SHARE = 1250000000000000  # 0.00125 ETH
 ETH_TARGET = 10**18 * 100000  # 100.000 ETH
 
+# Profiling, run tests with PROFILE=1 to trace executed opcodes
+PROFILE = os.environ.get('PROFILE')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profile/')
+PROFILE_TOP = int(os.environ.get('PROFILE_TOP', 20))
+
 
 class AbstractTestContract(TestCase):
     """
@@ -42,58 +50,68 @@ class AbstractTestContract(TestCase):
     """
 
     HOMESTEAD_BLOCK = 1150000
+    # Subclasses sharing one deployment create their state once in setUp
+    SHARED_STATE = False
 
     def __init__(self, *args, **kwargs):
         super(AbstractTestContract, self).__init__(*args, **kwargs)
         self.pp = PreProcessor()
-        self.s = t.state()
-        self.s.block.number = HOMESTEAD_BLOCK
+        self.s = None if self.SHARED_STATE else self.create_state()
+
+    @staticmethod
+    def create_state():
+        s = t.state()
+        s.block.number = HOMESTEAD_BLOCK
         # t.gas_limit = 4712388
         t.gas_limit = 2000000
+        return s
 
     def setUp(self):
-        contract_dir = 'contracts/'
+        self.contract_dir = 'contracts/'
         self.s.block.number = self.HOMESTEAD_BLOCK
+        self.profiler = Profiler(self.s) if PROFILE else None
         # Create mist wallet
         constructor_parameters = (
             [accounts[WS_1], accounts[WS_2], accounts[WS_3]],
             REQUIRED_ACCOUNTS,
             DAILY_LIMIT
         )
-        self.mist_wallet_contract = self.s.abi_contract(
-            self.pp.process('MistWallet.sol', add_dev_code=True, contract_dir=contract_dir),
-            language='solidity',
-            constructor_parameters=constructor_parameters
-        )
+        self.mist_wallet_contract = self.create_contract('MistWallet.sol', constructor_parameters=constructor_parameters)
         # Create contract
-        self.fund_contract = self.s.abi_contract(
-            self.pp.process('SingularDTVFund.sol', add_dev_code=True, contract_dir=contract_dir, addresses={
-                'MistWallet': self.a2h(self.mist_wallet_contract)
-            }),
-            language='solidity'
-        )
+        self.fund_contract = self.create_contract('SingularDTVFund.sol', addresses={
+            'MistWallet': self.a2h(self.mist_wallet_contract)
+        })
         # Crowdfunding contract is create by GUARD
-        self.crowdfunding_contract = self.s.abi_contract(
-            self.pp.process('SingularDTVCrowdfunding.sol', add_dev_code=True, contract_dir=contract_dir),
-            language='solidity'
-        )
-        self.token_contract = self.s.abi_contract(
-            self.pp.process('SingularDTVToken.sol', add_dev_code=True, contract_dir=contract_dir, addresses={
-                'SingularDTVFund': self.a2h(self.fund_contract),
-                'SingularDTVCrowdfunding': self.a2h(self.crowdfunding_contract)
-            }),
-            language='solidity'
-        )
-        self.weifund_contract = self.s.abi_contract(
-            self.pp.process('SingularDTVWeifund.sol', add_dev_code=True, contract_dir=contract_dir, addresses={
-                'SingularDTVFund': self.a2h(self.fund_contract),
-                'SingularDTVCrowdfunding': self.a2h(self.crowdfunding_contract)
-            }),
-            language='solidity'
-        )
+        self.crowdfunding_contract = self.create_contract('SingularDTVCrowdfunding.sol')
+        self.token_contract = self.create_contract('SingularDTVToken.sol', addresses={
+            'SingularDTVFund': self.a2h(self.fund_contract),
+            'SingularDTVCrowdfunding': self.a2h(self.crowdfunding_contract)
+        })
+        self.weifund_contract = self.create_contract('SingularDTVWeifund.sol', addresses={
+            'SingularDTVFund': self.a2h(self.fund_contract),
+            'SingularDTVCrowdfunding': self.a2h(self.crowdfunding_contract)
+        })
         # Setup contracts
         self.assertTrue(self.fund_contract.setup(self.crowdfunding_contract.address, self.token_contract.address))
         self.assertTrue(self.crowdfunding_contract.setup(self.fund_contract.address, self.token_contract.address))
+        if self.profiler:
+            self.profiler.start()
+
+    def tearDown(self):
+        if self.profiler:
+            self.profiler.stop()
+            self.profiler.write(os.path.join(PROFILE_DIR, self.id()), PROFILE_TOP)
+            sys.stdout.write("\n{}\n{}\n".format(self.id(), self.profiler.report(PROFILE_TOP)))
+
+    def create_contract(self, file_name, addresses=None, constructor_parameters=None):
+        contract = self.s.abi_contract(
+            self.pp.process(file_name, add_dev_code=True, contract_dir=self.contract_dir, addresses=addresses),
+            language='solidity',
+            constructor_parameters=constructor_parameters
+        )
+        if self.profiler:
+            self.profiler.add_contract(contract, file_name, add_dev_code=True, contract_dir=self.contract_dir, addresses=addresses)
+        return contract
 
     @staticmethod
     def a2h(contract):
@@ -0,0 +1,345 @@
+# ethereum
+from ethereum import slogging
+from preprocessor import PreProcessor
+# standard libraries
+from collections import defaultdict
+from binascii import hexlify, unhexlify
+import bisect
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import warnings
+
+
+MARKER = "//@@{}:{}"
+MARKER_PATTERN = re.compile(r'//@@([^:\s]+):(\d+)')
+COMMENT_PATTERN = re.compile(r'"(?:\\.|[^"\\])*"|//[^\n]*|/\*.*?\*/', re.DOTALL)
+FUNCTION_PATTERN = re.compile(r'\b(function|modifier)\b\s*(\w*)')
+HALTS = ("STOP", "RETURN", "SUICIDE", "SELFDESTRUCT")
+CALLS = ("CALL", "CALLCODE", "DELEGATECALL", "CREATE")
+# Source mappers are expensive to build and deployments are deterministic, so they are shared between tests.
+SOURCE_MAPPERS = {}
+
+
+def tag_sources(contract_dir, tagged_dir):
+    # append origin marker comment to every line of every contract file
+    for file_name in os.listdir(contract_dir):
+        if not file_name.endswith(".sol"):
+            continue
+        lines = open(os.path.join(contract_dir, file_name)).read().split("\n")
+        tagged = [line + MARKER.format(file_name, number + 1) for number, line in enumerate(lines)]
+        with open(os.path.join(tagged_dir, file_name), "w") as tagged_file:
+            tagged_file.write("\n".join(tagged))
+
+
+def line_origins(tagged_code):
+    # lines without marker (dev code) belong to the next marked line
+    origins = []
+    pending = 0
+    for line in tagged_code.split("\n"):
+        marker = MARKER_PATTERN.search(line)
+        if marker:
+            origins.extend([(marker.group(1), int(marker.group(2)))] * (pending + 1))
+            pending = 0
+        else:
+            pending += 1
+    origins.extend([None] * pending)
+    return origins
+
+
+def remove_comments(code):
+    # blank out comments but keep offsets, strings are left untouched
+    def blank(match):
+        text = match.group()
+        if text.startswith('"'):
+            return text
+        return re.sub(r'[^\n]', ' ', text)
+    return COMMENT_PATTERN.sub(blank, code)
+
+
+def function_ranges(code):
+    ranges = []
+    code = remove_comments(code)
+    for match in FUNCTION_PATTERN.finditer(code):
+        body = re.compile(r'[{;]').search(code, match.end())
+        if not body or body.group() == ";":
+            continue
+        name = match.group(2) or "<fallback>"
+        ranges.append((match.start(), PreProcessor.find_scope_end(code, body.end()), name))
+    return ranges
+
+
+def innermost_function(ranges, offset):
+    function = None
+    for start, end, name in ranges:
+        if start <= offset <= end and (function is None or start > function[0]):
+            function = (start, name)
+    return function[1] if function else "<dispatch>"
+
+
+def decode_srcmap(srcmap):
+    entries = []
+    entry = [-1, -1, -1, "-"]
+    for item in srcmap.split(";"):
+        for index, field in enumerate(item.split(":")[:4]):
+            if field:
+                entry[index] = field if index == 3 else int(field)
+        entries.append(tuple(entry))
+    return entries
+
+
+def instruction_offsets(bytecode):
+    # PUSH1 - PUSH32 carry 1 - 32 bytes of immediate data
+    code = bytearray(unhexlify(bytecode))
+    offsets = []
+    pc = 0
+    while pc < len(code):
+        offsets.append(pc)
+        pc += 1 + (code[pc] - 0x5f if 0x60 <= code[pc] <= 0x7f else 0)
+    return offsets
+
+
+def compile_runtime(code):
+    process = subprocess.Popen(
+        ['solc', '--optimize', '--combined-json', 'bin-runtime,srcmap-runtime'],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    output, error = process.communicate(code)
+    if process.returncode != 0:
+        raise Exception("solc failed: {}".format(error))
+    return json.loads(output)["contracts"]
+
+
+class SourceMapper:
+    """
+    Maps program counters of a deployed contract to function and original source line.
+    """
+
+    def __init__(self, name, code, origins, bytecode, srcmap):
+        self.name = name
+        self.locations = {}
+        ranges = function_ranges(code)
+        newlines = [match.start() for match in re.finditer("\n", code)]
+        entries = decode_srcmap(srcmap)
+        for index, pc in enumerate(instruction_offsets(bytecode)[:len(entries)]):
+            start, length, file_index, jump = entries[index]
+            if start < 0 or file_index < 0:
+                self.locations[pc] = ("<compiler>", "<compiler>")
+                continue
+            origin = origins[bisect.bisect_right(newlines, start)]
+            location = "{}:{}".format(*origin) if origin else "<preprocessor>"
+            self.locations[pc] = (innermost_function(ranges, start), location)
+
+    def locate(self, pc):
+        function, location = self.locations.get(pc, ("<unknown>", "pc:{}".format(pc)))
+        return self.name, function, location
+
+
+class Frame:
+
+    def __init__(self, address, depth, gas, callers):
+        self.address = address
+        self.depth = depth
+        self.start_gas = gas
+        self.gas = gas
+        self.pc = None
+        self.op = None
+        # vm_execute counts steps per call, the next event of this frame carries this value
+        self.steps = 0
+        self.child_gas = 0
+        self.callers = callers
+
+    def expects(self, event):
+        return self.steps == event["steps"] and self.op not in HALTS and int(event["gas"]) <= self.gas
+
+    def resumes(self, event):
+        # a caller continues right after its one byte CALL opcode
+        return self.expects(event) and self.op in CALLS and int(event["pc"]) == self.pc + 1
+
+
+class TraceRecorder(slogging.LogRecorder):
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        slogging.LogRecorder.__init__(self, disable_other_handlers=True, log_config='eth.vm.op:trace')
+
+    def _add_log_record(self, msg):
+        # events are aggregated right away instead of being buffered by LogRecorder
+        if msg.get("event") == "vm":
+            self.profiler.trace(msg)
+
+
+class Profiler:
+    """
+    Aggregates gas and steps of executed opcodes by contract, function and source line.
+
+    run tests with PROFILE=1 python -m unittest discover tests
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.pp = PreProcessor()
+        self.mappers = {}
+        self.sources = {}
+        self.lines = defaultdict(lambda: [0, 0])
+        self.stacks = defaultdict(lambda: [0, 0])
+        self.frames = []
+        self.recorder = None
+
+    def add_contract(self, contract, file_name, add_dev_code=False, contract_dir="", addresses=None):
+        deployed_code = hexlify(self.state.block.get_code(contract.address))
+        key = (file_name, add_dev_code, contract_dir, tuple(sorted((addresses or {}).items())), deployed_code)
+        if key not in SOURCE_MAPPERS:
+            SOURCE_MAPPERS[key] = self.source_mapper(file_name, add_dev_code, contract_dir, addresses, deployed_code)
+        mapper, sources = SOURCE_MAPPERS[key]
+        self.mappers[contract.address] = mapper
+        self.sources.update(sources)
+
+    def source_mapper(self, file_name, add_dev_code, contract_dir, addresses, deployed_code):
+        code = self.pp.process(file_name, add_dev_code=add_dev_code, contract_dir=contract_dir, addresses=addresses)
+        tagged_dir = tempfile.mkdtemp()
+        try:
+            tag_sources(contract_dir, tagged_dir)
+            tagged_code = self.pp.process(file_name, add_dev_code=add_dev_code, contract_dir=tagged_dir + "/", addresses=addresses)
+        finally:
+            shutil.rmtree(tagged_dir)
+        origins = line_origins(tagged_code)
+        sources = {}
+        for source_name in set(origin[0] for origin in origins if origin):
+            sources[source_name] = open(contract_dir + source_name).read().split("\n")
+        for contract_name, compiled in compile_runtime(code).items():
+            if compiled["bin-runtime"] == deployed_code:
+                mapper = SourceMapper(
+                    contract_name.split(":")[-1], code, origins, compiled["bin-runtime"], compiled["srcmap-runtime"]
+                )
+                return mapper, sources
+        warnings.warn(
+            "No solc runtime bytecode of {} matches the deployed code, opcodes are reported by pc only. "
+            "Check that solc version and flags match the tester's compiler.".format(file_name)
+        )
+        return SourceMapper(file_name.split(".")[0], "", [], "", ""), sources
+
+    def reset(self):
+        self.lines.clear()
+        self.stacks.clear()
+        self.frames = []
+
+    def start(self):
+        self.recorder = TraceRecorder(self)
+
+    def stop(self):
+        self.recorder.pop_records()
+        self.recorder = None
+        self.pop_frames(0)
+
+    @staticmethod
+    def normalize_address(address):
+        if len(address) == 42 and address.startswith("0x"):
+            address = address[2:]
+        if len(address) == 40:
+            return unhexlify(address)
+        return address
+
+    def locate(self, address, pc):
+        if address in self.mappers:
+            return self.mappers[address].locate(pc)
+        return hexlify(address), "<unknown>", "pc:{}".format(pc)
+
+    def trace(self, event):
+        gas = int(event["gas"])
+        if event["steps"] == 0:
+            # only the first step of a call carries depth and address
+            self.pop_frames(event["depth"])
+            callers = ()
+            if self.frames:
+                caller = self.frames[-1]
+                contract, function, location = self.locate(caller.address, caller.pc)
+                callers = caller.callers + ("{}.{}".format(contract, function), location)
+            self.frames.append(Frame(self.normalize_address(event["address"]), event["depth"], gas, callers))
+        else:
+            # frames not expecting this step have returned, callees without any recorded step never got a frame
+            while self.frames and (
+                not self.frames[-1].expects(event) or len(self.frames) > 1 and self.frames[-2].resumes(event)
+            ):
+                self.pop_frame()
+        if not self.frames:
+            return
+        frame = self.frames[-1]
+        self.charge(frame, gas)
+        frame.pc = int(event["pc"])
+        frame.op = event["op"]
+        frame.gas = gas
+        frame.steps += 1
+
+    def charge(self, frame, gas):
+        # cost of the previous opcode excluding gas spent in calls made by it
+        if frame.pc is None:
+            return
+        cost = max(frame.gas - gas - frame.child_gas, 0)
+        frame.child_gas = 0
+        contract, function, location = self.locate(frame.address, frame.pc)
+        for totals in (
+            self.lines[(contract, function, location)],
+            self.stacks[frame.callers + ("{}.{}".format(contract, function), location)]
+        ):
+            totals[0] += cost
+            totals[1] += 1
+
+    def pop_frame(self):
+        frame = self.frames.pop()
+        # STOP and RETURN hand the remaining gas back, any other last opcode failed (e.g. throw by an invalid
+        # JUMP) and burnt it. The caller's CALL is charged its next gas reading minus all gas used by the callee.
+        last_cost = 0 if frame.op in HALTS else frame.gas
+        self.charge(frame, frame.gas - last_cost)
+        if self.frames:
+            self.frames[-1].child_gas += frame.start_gas - frame.gas + last_cost
+
+    def pop_frames(self, depth):
+        while self.frames and self.frames[-1].depth >= depth:
+            self.pop_frame()
+
+    def folded(self, metric=0):
+        # flame graph folded stacks, metric 0 is gas, 1 is steps
+        return "\n".join(
+            "{} {}".format(";".join(stack), totals[metric])
+            for stack, totals in sorted(self.stacks.items()) if totals[metric]
+        )
+
+    def source_line(self, location):
+        file_name, _, line = location.rpartition(":")
+        if file_name in self.sources and line.isdigit():
+            return self.sources[file_name][int(line) - 1].strip()
+        return ""
+
+    def report(self, count=20):
+        total_gas = sum(totals[0] for totals in self.lines.values()) or 1
+        functions = defaultdict(lambda: [0, 0])
+        for (contract, function, location), totals in self.lines.items():
+            functions["{}.{}".format(contract, function)][0] += totals[0]
+            functions["{}.{}".format(contract, function)][1] += totals[1]
+        rows = ["{:>10} {:>6} {:>8}  {}".format("gas", "%", "steps", "function")]
+        for function, totals in sorted(functions.items(), key=lambda item: -item[1][0])[:count]:
+            rows.append("{:>10} {:>6.2f} {:>8}  {}".format(totals[0], 100.0 * totals[0] / total_gas, totals[1], function))
+        rows.append("")
+        rows.append("{:>10} {:>6} {:>8}  {:<40} {:<40} {}".format("gas", "%", "steps", "function", "line", "source"))
+        for (contract, function, location), totals in sorted(self.lines.items(), key=lambda item: -item[1][0])[:count]:
+            rows.append("{:>10} {:>6.2f} {:>8}  {:<40} {:<40} {}".format(
+                totals[0], 100.0 * totals[0] / total_gas, totals[1],
+                "{}.{}".format(contract, function), location, self.source_line(location)
+            ))
+        return "\n".join(rows)
+
+    def write(self, path, count=20):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        for extension, content in ((".gas.folded", self.folded(0)),
+                                   (".steps.folded", self.folded(1)),
+                                   (".txt", self.report(count))):
+            with open(path + extension, "w") as output_file:
+                output_file.write(content + "\n")
@@ -0,0 +1,207 @@
+# ethereum
+from ethereum.tester import keys, accounts
+from ethereum.tester import TransactionFailed
+# standard libraries
+from binascii import hexlify
+import abstract_test
+import ast
+import json
+import operator
+import re
+import time
+
+
+OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.floordiv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.USub: operator.neg,
+}
+ADDRESS_PATTERN = re.compile(r'^0x[0-9a-fA-F]{40}$')
+# Step type: (runner method, required keys, optional keys)
+STEPS = {
+    "transaction": ("call", {"contract", "name"}, {"params", "sender", "value", "return", "fails", "save"}),
+    # read-only check of a contract's return value, it cannot send value or expect a failure
+    "assertion": ("call", {"contract", "name"}, {"params", "sender", "return", "save"}),
+    "send": ("send", {"to"}, {"sender", "value", "fails"}),
+    "balance": ("balance", {"account"}, {"balance", "save"}),
+    "timewarp": ("timewarp", {"period"}, set()),
+}
+STEP_KEYS = {"type", "description"}
+SCENARIO_KEYS = {"name", "steps"}
+
+
+def validate_step(step):
+    if not isinstance(step, dict):
+        return "step is not an object"
+    if step.get("type") not in STEPS:
+        return "unknown step type {}".format(step.get("type"))
+    method, required, optional = STEPS[step["type"]]
+    missing = required - set(step)
+    unknown = set(step) - required - optional - STEP_KEYS
+    if missing:
+        return "missing keys {}".format(", ".join(sorted(missing)))
+    if unknown:
+        return "unknown keys {}".format(", ".join(sorted(unknown)))
+    if step.get("fails") and ("return" in step or "save" in step):
+        return "failing step cannot have return or save"
+
+
+def validate_scenarios(scenarios, path):
+    for scenario_index, scenario in enumerate(scenarios):
+        if not isinstance(scenario, dict) or set(scenario) != SCENARIO_KEYS or not isinstance(scenario["steps"], list):
+            raise Exception("{}: scenario {}: expected keys {}".format(path, scenario_index, ", ".join(sorted(SCENARIO_KEYS))))
+        for index, step in enumerate(scenario["steps"]):
+            error = validate_step(step)
+            if error:
+                raise Exception("{}: scenario {} step {}: {}".format(path, scenario["name"], index, error))
+
+
+def load_scenarios(path):
+    # scenario files contain one scenario or a list of scenarios
+    with open(path) as scenario_file:
+        if path.endswith((".yml", ".yaml")):
+            import yaml
+            scenarios = yaml.safe_load(scenario_file)
+        else:
+            scenarios = json.load(scenario_file)
+    scenarios = scenarios if isinstance(scenarios, list) else [scenarios]
+    validate_scenarios(scenarios, path)
+    return scenarios
+
+
+def evaluate_node(node, namespace):
+    if isinstance(node, ast.Num):
+        return node.n
+    if isinstance(node, ast.Name):
+        if node.id not in namespace:
+            raise Exception("Unknown name {}".format(node.id))
+        return namespace[node.id]
+    if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+        return OPERATORS[type(node.op)](evaluate_node(node.left, namespace), evaluate_node(node.right, namespace))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in OPERATORS:
+        return OPERATORS[type(node.op)](evaluate_node(node.operand, namespace))
+    if isinstance(node, ast.Subscript):
+        index = node.slice.value if isinstance(node.slice, ast.Index) else node.slice
+        return evaluate_node(node.value, namespace)[evaluate_node(index, namespace)]
+    raise Exception("Unsupported expression {}".format(ast.dump(node)))
+
+
+def evaluate(value, namespace):
+    """
+    Resolves a scenario value. Strings are arithmetic expressions over test constants, accounts, contract names
+    and saved results, e.g. "ETH_VALUE_PER_SHARE * 1000" or "accounts[BACKER_1]". Addresses resolve to hex without 0x
+    like the tester's return values.
+    """
+    if isinstance(value, list):
+        return [evaluate(item, namespace) for item in value]
+    if isinstance(value, dict):
+        # encoded function call, e.g. data for the mist wallet's execute function
+        contract = namespace["contracts"][value["contract"]]
+        return contract.translator.encode(value["name"], evaluate(value.get("params", []), namespace))
+    if not isinstance(value, (str, type(u""))):
+        return value
+    if ADDRESS_PATTERN.match(value):
+        return value[2:].lower()
+    return evaluate_node(ast.parse(value.strip(), mode="eval").body, namespace)
+
+
+class ScenarioRunner:
+    """
+    Runs scenario steps against already deployed contracts and records the duration of every step.
+    """
+
+    def __init__(self, test_case, contracts):
+        self.test_case = test_case
+        self.s = test_case.s
+        self.contracts = contracts
+        self.timings = []
+
+    def namespace(self):
+        namespace = dict((name, value) for name, value in vars(abstract_test).items() if name.isupper())
+        namespace.update((name, hexlify(contract.address)) for name, contract in self.contracts.items())
+        namespace["accounts"] = [hexlify(account) for account in accounts]
+        namespace["contracts"] = self.contracts
+        return namespace
+
+    @staticmethod
+    def describe(index, step):
+        if "description" in step:
+            return "{} {}".format(index, step["description"])
+        if "contract" in step:
+            return "{} {} {}.{}".format(index, step["type"], step["contract"], step["name"])
+        return "{} {}".format(index, step["type"])
+
+    def call(self, step, namespace, message):
+        if step["contract"] not in self.contracts:
+            raise Exception("unknown contract {}".format(step["contract"]))
+        contract = self.contracts[step["contract"]]
+        function = getattr(contract, step["name"])
+        params = evaluate(step.get("params", []), namespace)
+        kwargs = {
+            "sender": keys[evaluate(step.get("sender", "OWNER"), namespace)],
+            "value": evaluate(step.get("value", 0), namespace)
+        }
+        if step.get("fails"):
+            self.assert_fails(message, function, *params, **kwargs)
+            return
+        result = function(*params, **kwargs)
+        if "return" in step:
+            self.test_case.assertEqual(result, evaluate(step["return"], namespace), message)
+        if "save" in step:
+            namespace[step["save"]] = result
+
+    def assert_fails(self, message, function, *args, **kwargs):
+        try:
+            function(*args, **kwargs)
+        except TransactionFailed:
+            return
+        self.test_case.fail("{}: TransactionFailed not raised".format(message))
+
+    def send(self, step, namespace, message):
+        params = (
+            keys[evaluate(step.get("sender", "OWNER"), namespace)],
+            evaluate(step["to"], namespace),
+            evaluate(step.get("value", 0), namespace)
+        )
+        if step.get("fails"):
+            self.assert_fails(message, self.s.send, *params)
+        else:
+            self.s.send(*params)
+
+    def balance(self, step, namespace, message):
+        balance = self.s.block.get_balance(evaluate(step["account"], namespace))
+        if "balance" in step:
+            self.test_case.assertEqual(balance, evaluate(step["balance"], namespace), message)
+        if "save" in step:
+            namespace[step["save"]] = balance
+
+    def timewarp(self, step, namespace, message):
+        self.s.block.timestamp += evaluate(step["period"], namespace)
+
+    def run(self, scenario):
+        namespace = self.namespace()
+        for index, step in enumerate(scenario["steps"]):
+            description = self.describe(index, step)
+            # block timestamp at the time of the step, like now in Solidity
+            namespace["now"] = self.s.block.timestamp
+            message = "{}: step {}".format(scenario["name"], description)
+            start = time.time()
+            try:
+                getattr(self, STEPS[step["type"]][0])(step, namespace, message)
+            except AssertionError:
+                raise
+            except Exception as error:
+                raise Exception("{}: {}: {}".format(message, type(error).__name__, error))
+            self.timings.append((description, time.time() - start))
+
+    def report(self):
+        rows = ["{:>10}  {}".format("seconds", "step")]
+        for description, seconds in self.timings:
+            rows.append("{:>10.4f}  {}".format(seconds, description))
+        rows.append("{:>10.4f}  total".format(sum(seconds for description, seconds in self.timings)))
+        return "\n".join(rows)
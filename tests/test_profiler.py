@@ -0,0 +1,147 @@
+# ethereum
+from ethereum import slogging
+from profiler import Profiler, SourceMapper, decode_srcmap, instruction_offsets, tag_sources, line_origins, \
+    function_ranges, innermost_function
+from preprocessor import PreProcessor
+# standard libraries
+from binascii import hexlify
+from unittest import TestCase
+import shutil
+import tempfile
+
+
+A = "\x01" * 20
+B = "\x02" * 20
+
+
+class TestContract(TestCase):
+    """
+    run test with python -m unittest tests.test_profiler
+    """
+
+    def test_decode_srcmap(self):
+        # Empty fields are taken over from the previous entry.
+        self.assertEqual(
+            decode_srcmap("1:2:0:-;;3::1:i;:4;5:6:-1:o:1"),
+            [(1, 2, 0, "-"), (1, 2, 0, "-"), (3, 2, 1, "i"), (3, 4, 1, "i"), (5, 6, -1, "o")]
+        )
+
+    def test_instruction_offsets(self):
+        # PUSH1 0x01, PUSH2 0xffff, PUSH32 0x00..00, STOP
+        self.assertEqual(instruction_offsets("6001" + "61ffff" + "7f" + "00" * 32 + "00"), [0, 2, 5, 38])
+
+    def test_line_origins(self):
+        pp = PreProcessor()
+        tagged_dir = tempfile.mkdtemp()
+        try:
+            tag_sources('contracts/', tagged_dir)
+            code = pp.process('SingularDTVFund.sol', add_dev_code=True, contract_dir='contracts/')
+            tagged_code = pp.process('SingularDTVFund.sol', add_dev_code=True, contract_dir=tagged_dir + '/')
+        finally:
+            shutil.rmtree(tagged_dir)
+        lines = code.split("\n")
+        origins = line_origins(tagged_code)
+        self.assertEqual(len(lines), len(origins))
+        # Imported files are inlined at the position of the import.
+        self.assertEqual(origins[0], ('AbstractToken.sol', 1))
+        # Dev code belongs to the contract header it is inserted after.
+        header = origins.index(('SingularDTVFund.sol', 7))
+        self.assertEqual(lines[header], "contract SingularDTVFund {")
+        self.assertEqual(lines[header + 1].strip(), "event Log(uint);")
+        self.assertEqual(origins[header + 1], ('SingularDTVFund.sol', 7))
+        source = open('contracts/SingularDTVFund.sol').read().split("\n")
+        for line, origin in zip(lines, origins):
+            if origin and origin[0] == 'SingularDTVFund.sol' and origin != origins[header]:
+                self.assertEqual(line.strip(), source[origin[1] - 1].strip())
+
+    def test_function_ranges(self):
+        code = """
+contract Test {
+    // function commented(uint a) {}
+    modifier onlyOwner() { _ }
+    function abstract();
+    function test(uint a) onlyOwner returns (uint) { if (a > 0) { return a; } }
+    function () { throw; }
+}"""
+        ranges = function_ranges(code)
+        self.assertEqual([name for start, end, name in ranges], ["onlyOwner", "test", "<fallback>"])
+        self.assertEqual(innermost_function(ranges, code.index("return a")), "test")
+        self.assertEqual(innermost_function(ranges, code.index("_ }")), "onlyOwner")
+        self.assertEqual(innermost_function(ranges, code.index("throw")), "<fallback>")
+        self.assertEqual(innermost_function(ranges, code.index("contract")), "<dispatch>")
+
+    @staticmethod
+    def profiler():
+        profiler = Profiler(None)
+        for address, name in ((A, "Caller"), (B, "Callee")):
+            profiler.mappers[address] = SourceMapper(name, "", [], "", "")
+        profiler.mappers[A].locations = dict((pc, ("run", "A.sol:{}".format(pc))) for pc in range(5))
+        profiler.mappers[B].locations = dict((pc, ("work", "B.sol:{}".format(pc))) for pc in range(5))
+        return profiler
+
+    @staticmethod
+    def event(steps, gas, pc, op, depth=None, address=None):
+        # like vm_execute, depth and address are only part of the first step of a call
+        event = {"steps": steps, "gas": str(gas), "pc": str(pc), "op": op}
+        if steps == 0:
+            event.update(depth=depth, address=hexlify(address))
+        return event
+
+    def test_nested_call_gas(self):
+        profiler = self.profiler()
+        for event in (
+            self.event(0, 100, 0, "PUSH1", 0, A),
+            self.event(1, 97, 1, "CALL"),
+            # CALL at pc 1 of A enters B with 50 gas, B spends 5 gas
+            self.event(0, 50, 0, "PUSH1", 1, B),
+            self.event(1, 45, 1, "STOP"),
+            self.event(2, 40, 2, "CALL"),
+            # B has no code or fails before its first step, there are no events for it
+            self.event(3, 30, 3, "STOP"),
+        ):
+            profiler.trace(event)
+        profiler.pop_frames(0)
+        # The first CALL is charged 97 - 40 minus the 5 gas spent in B.
+        self.assertEqual(profiler.lines[("Caller", "run", "A.sol:0")], [3, 1])
+        self.assertEqual(profiler.lines[("Caller", "run", "A.sol:1")], [52, 1])
+        self.assertEqual(profiler.lines[("Caller", "run", "A.sol:2")], [10, 1])
+        self.assertEqual(profiler.lines[("Caller", "run", "A.sol:3")], [0, 1])
+        self.assertEqual(profiler.lines[("Callee", "work", "B.sol:0")], [5, 1])
+        self.assertEqual(profiler.lines[("Callee", "work", "B.sol:1")], [0, 1])
+        self.assertEqual(
+            profiler.folded().split("\n"),
+            ["Caller.run;A.sol:0 3", "Caller.run;A.sol:1 52", "Caller.run;A.sol:1;Callee.work;B.sol:0 5",
+             "Caller.run;A.sol:2 10"]
+        )
+        self.assertEqual(sum(totals[0] for totals in profiler.lines.values()), 70)
+
+    def test_throw_gas(self):
+        profiler = self.profiler()
+        for event in (
+            self.event(0, 100, 0, "PUSH1", 0, A),
+            self.event(1, 97, 1, "CALL"),
+            self.event(0, 50, 0, "PUSH1", 1, B),
+            # B throws by jumping to an invalid destination and burns its remaining 45 gas
+            self.event(1, 45, 1, "JUMP"),
+            self.event(2, 30, 2, "JUMP"),
+        ):
+            profiler.trace(event)
+        # A throws too, the remaining 30 gas are burnt at the top level
+        profiler.pop_frames(0)
+        self.assertEqual(profiler.lines[("Callee", "work", "B.sol:1")], [45, 1])
+        self.assertEqual(profiler.lines[("Caller", "run", "A.sol:1")], [97 - 30 - 50, 1])
+        self.assertEqual(profiler.lines[("Caller", "run", "A.sol:2")], [30, 1])
+        self.assertEqual(sum(totals[0] for totals in profiler.lines.values()), 100)
+
+    def test_trace_recorder(self):
+        profiler = self.profiler()
+        profiler.start()
+        try:
+            log_vm_op = slogging.get_logger('eth.vm.op')
+            self.assertTrue(log_vm_op.is_active('trace'))
+            log_vm_op.trace('vm', **self.event(0, 100, 0, "PUSH1", 0, A))
+            log_vm_op.trace('vm', **self.event(1, 97, 1, "STOP"))
+        finally:
+            profiler.stop()
+        self.assertEqual(profiler.lines[("Caller", "run", "A.sol:0")], [3, 1])
+        self.assertEqual(profiler.lines[("Caller", "run", "A.sol:1")], [0, 1])
@@ -0,0 +1,119 @@
+from ethereum.tester import TransactionFailed
+from abstract_test import DAY
+from scenario import ScenarioRunner, evaluate, load_scenarios
+# standard libraries
+from binascii import hexlify
+from unittest import TestCase
+import json
+import os
+import shutil
+import tempfile
+
+
+CROWDFUNDING = "\x01" * 20
+
+
+class Block:
+
+    def __init__(self):
+        self.timestamp = 0
+        self.balances = {}
+
+    def get_balance(self, address):
+        return self.balances.get(address, 0)
+
+
+class State:
+
+    def __init__(self):
+        self.block = Block()
+
+
+class Crowdfunding:
+
+    address = CROWDFUNDING
+
+    @staticmethod
+    def fund(sender=None, value=0):
+        if value == 0:
+            raise TransactionFailed()
+        return value
+
+
+class TestScenarioRunner(TestCase):
+    """
+    run test with python -m unittest tests.test_scenario_runner
+    """
+
+    def setUp(self):
+        self.s = State()
+        self.runner = ScenarioRunner(self, {'SingularDTVCrowdfunding': Crowdfunding()})
+
+    def run_steps(self, *steps):
+        self.runner.run({'name': 'Test', 'steps': list(steps)})
+
+    def test_fails_step_succeeds(self):
+        with self.assertRaises(AssertionError) as context:
+            self.run_steps({'type': 'transaction', 'description': 'Funding without value', 'contract': 'SingularDTVCrowdfunding',
+                            'name': 'fund', 'value': 1, 'fails': True})
+        self.assertIn("Test: step 0 Funding without value: TransactionFailed not raised", str(context.exception))
+
+    def test_wrong_return(self):
+        self.run_steps({'type': 'transaction', 'contract': 'SingularDTVCrowdfunding', 'name': 'fund', 'value': 0,
+                        'fails': True})
+        with self.assertRaises(AssertionError) as context:
+            self.run_steps({'type': 'transaction', 'description': 'Funding returns value', 'contract': 'SingularDTVCrowdfunding',
+                            'name': 'fund', 'value': 'DAY', 'return': 'DAY + 1'})
+        self.assertIn("Test: step 0 Funding returns value", str(context.exception))
+
+    def test_wrong_balance(self):
+        self.s.block.balances[hexlify(CROWDFUNDING)] = 5
+        self.run_steps({'type': 'balance', 'account': 'SingularDTVCrowdfunding', 'balance': 5})
+        with self.assertRaises(AssertionError) as context:
+            self.run_steps({'type': 'timewarp', 'period': 'DAY'},
+                           {'type': 'balance', 'account': 'SingularDTVCrowdfunding', 'balance': 'now'})
+        self.assertIn("Test: step 1 balance", str(context.exception))
+        self.assertEqual(self.s.block.timestamp, DAY)
+
+    def test_step_errors(self):
+        for step, error in (
+            ({'type': 'transaction', 'contract': 'SingularDTVFund', 'name': 'setup'}, "unknown contract SingularDTVFund"),
+            ({'type': 'transaction', 'contract': 'SingularDTVCrowdfunding', 'name': 'fund', 'sender': 'UNKNOWN'},
+             "Unknown name UNKNOWN"),
+            ({'type': 'transaction', 'contract': 'SingularDTVCrowdfunding', 'name': 'fund', 'sender': 100}, "IndexError"),
+            ({'type': 'transaction', 'contract': 'SingularDTVCrowdfunding', 'name': 'fund'}, "TransactionFailed"),
+        ):
+            with self.assertRaises(Exception) as context:
+                self.run_steps({'type': 'timewarp', 'period': 'DAY'}, step)
+            self.assertIn("Test: step 1 transaction", str(context.exception))
+            self.assertIn(error, str(context.exception))
+
+    def test_evaluate(self):
+        namespace = {'DAY': DAY, 'accounts': ['ab' * 20]}
+        self.assertEqual(evaluate("DAY * 3 / 2 - -1", namespace), DAY * 3 // 2 + 1)
+        self.assertEqual(evaluate("accounts[0]", namespace), 'ab' * 20)
+        self.assertEqual(evaluate("0x0196B712a0459cbee711e7c1d34d2c85a9910379", namespace),
+                         "0196b712a0459cbee711e7c1d34d2c85a9910379")
+        for expression in ("UNKNOWN", "DAY.real", "open('requests.jsonl')", "[DAY]", "DAY if DAY else 0"):
+            self.assertRaises(Exception, evaluate, expression, namespace)
+
+    def test_validation(self):
+        scenario_dir = tempfile.mkdtemp()
+        try:
+            for steps, error in (
+                ([{'contract': 'SingularDTVCrowdfunding'}], "step 0: unknown step type None"),
+                ([{'type': 'timewarp', 'period': 'DAY'}, {'type': 'timewarp', 'seconds': 1}], "step 1: missing keys period"),
+                ([{'type': 'balance', 'account': 'MistWallet', 'value': 1}], "step 0: unknown keys value"),
+                ([{'type': 'transaction', 'contract': 'MistWallet', 'name': 'kill', 'fails': True, 'save': 'x'}], "step 0: failing step cannot have"),
+                ([{'type': 'assertion', 'contract': 'MistWallet', 'name': 'kill', 'value': 1}], "step 0: unknown keys value"),
+                ([{'type': 'assertion', 'contract': 'MistWallet', 'name': 'kill', 'fails': True}], "step 0: unknown keys fails"),
+            ):
+                path = os.path.join(scenario_dir, 'invalid.json')
+                with open(path, 'w') as scenario_file:
+                    json.dump({'name': 'Invalid', 'steps': steps}, scenario_file)
+                with self.assertRaises(Exception) as context:
+                    load_scenarios(path)
+                self.assertIn("{}: scenario Invalid {}".format(path, error), str(context.exception))
+        finally:
+            shutil.rmtree(scenario_dir)
+
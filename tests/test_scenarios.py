@@ -0,0 +1,95 @@
+from abstract_test import *
+from scenario import ScenarioRunner, load_scenarios
+import os
+import re
+import sys
+import time
+
+
+SCENARIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenarios')
+# Print per step timing, run tests with SCENARIO_TIMING=1
+SCENARIO_TIMING = os.environ.get('SCENARIO_TIMING')
+
+
+class TestContract(AbstractTestContract):
+    """
+    run test with python -m unittest tests.test_scenarios
+    """
+
+    # Scenario contract names to test attributes
+    CONTRACTS = {
+        'MistWallet': 'mist_wallet_contract',
+        'SingularDTVFund': 'fund_contract',
+        'SingularDTVCrowdfunding': 'crowdfunding_contract',
+        'SingularDTVToken': 'token_contract',
+        'SingularDTVWeifund': 'weifund_contract',
+    }
+    # All scenarios share one deployment, every scenario starts from its snapshot.
+    deployment = None
+    SHARED_STATE = True
+
+    def __init__(self, *args, **kwargs):
+        super(TestContract, self).__init__(*args, **kwargs)
+
+    def setUp(self):
+        deployment = TestContract.deployment
+        if deployment is None:
+            start = time.time()
+            self.s = self.create_state()
+            super(TestContract, self).setUp()
+            TestContract.deployment = {
+                'state': self.s,
+                'snapshot': self.s.snapshot(),
+                'timestamp': self.s.block.timestamp,
+                'contracts': dict((name, getattr(self, attribute)) for name, attribute in self.CONTRACTS.items()),
+                'profiler': self.profiler
+            }
+            if SCENARIO_TIMING:
+                sys.stdout.write("\nDeployment: {:.4f} seconds\n".format(time.time() - start))
+            return
+        self.s = deployment['state']
+        self.s.revert(deployment['snapshot'])
+        for name, attribute in self.CONTRACTS.items():
+            setattr(self, attribute, deployment['contracts'][name])
+        self.profiler = deployment['profiler']
+        if self.profiler:
+            self.profiler.reset()
+            if not self.profiler.recorder:
+                self.profiler.start()
+
+    def run_scenario(self, scenario):
+        runner = ScenarioRunner(self, TestContract.deployment['contracts'])
+        runner.run(scenario)
+        if SCENARIO_TIMING:
+            sys.stdout.write("\n{}\n{}\n".format(scenario['name'], runner.report()))
+
+    def test_snapshot_revert(self):
+        self.run_scenario({'name': 'Changes state', 'steps': [
+            {'type': 'timewarp', 'period': 'CROWDFUNDING_PERIOD / 2'},
+            {'type': 'transaction', 'contract': 'SingularDTVCrowdfunding', 'name': 'fund', 'sender': 'BACKER_1',
+             'value': 'ETH_VALUE_PER_SHARE', 'return': 1}
+        ]})
+        # The next scenario starts from the deployment again.
+        self.setUp()
+        self.assertEqual(self.s.block.timestamp, TestContract.deployment['timestamp'])
+        self.run_scenario({'name': 'Starts from snapshot', 'steps': [
+            {'type': 'balance', 'account': 'SingularDTVCrowdfunding', 'balance': 0},
+            {'type': 'assertion', 'contract': 'SingularDTVToken', 'name': 'balanceOf', 'params': ['accounts[BACKER_1]'],
+             'return': 0},
+            {'type': 'assertion', 'contract': 'SingularDTVCrowdfunding', 'name': 'startDate', 'return': 'now'}
+        ]})
+
+
+def add_scenario_tests():
+    # test names are derived from scenario names, which have to be unique
+    for file_name in sorted(os.listdir(SCENARIO_DIR)):
+        if not file_name.endswith(('.json', '.yml', '.yaml')):
+            continue
+        for scenario in load_scenarios(os.path.join(SCENARIO_DIR, file_name)):
+            name = 'test_' + re.sub(r'\W+', '_', scenario['name'].lower()).strip('_')
+            if hasattr(TestContract, name):
+                raise Exception("{}: scenario {} collides with an existing test {}".format(file_name, scenario['name'], name))
+            setattr(TestContract, name, lambda self, scenario=scenario: self.run_scenario(scenario))
+
+
+add_scenario_tests()